@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import belullama_terminal_chat as chat_module
+
+MOCK_MODEL = "mock-model:latest"
+MOCK_DIGEST = "sha256:" + "0" * 64
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json({"models": [{"name": MOCK_MODEL, "digest": MOCK_DIGEST}]})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/chat":
+            self.generate(body, lambda token: {"message": {"role": "assistant", "content": token}})
+        elif self.path == "/api/generate":
+            self.generate(body, lambda token: {"response": token})
+        elif self.path == "/api/pull":
+            self.pull(body)
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def send_json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def generate(self, body, make_chunk):
+        config = self.server.config
+        start = time.perf_counter()
+        prompt_chars = len(json.dumps(body.get("messages", body.get("prompt", ""))))
+        tokens = [f"tok{i} " for i in range(config["response_tokens"])]
+        delay = 1 / config["token_rate"] if config["token_rate"] else 0
+
+        time.sleep(config["latency"])
+        eval_start = time.perf_counter()
+        if body.get("stream", True):
+            self.start_stream()
+            for token in tokens:
+                if delay:
+                    time.sleep(delay)
+                chunk = make_chunk(token)
+                chunk["done"] = False
+                self.write_chunk(chunk)
+        elif delay:
+            time.sleep(delay * len(tokens))
+
+        final = make_chunk("" if body.get("stream", True) else "".join(tokens))
+        final.update({
+            "done": True,
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": len(tokens),
+            "eval_duration": int((time.perf_counter() - eval_start) * 1e9),
+            # The client subtracts this from its own wall time to get its overhead
+            "total_duration": int((time.perf_counter() - start) * 1e9)
+        })
+        if body.get("stream", True):
+            self.write_chunk(final)
+            self.end_stream()
+        else:
+            self.send_json(final)
+
+    def pull(self, body):
+        config = self.server.config
+        total = config["pull_bytes"]
+        step = max(1, total // 100)
+        self.start_stream()
+        self.write_chunk({"status": "pulling manifest"})
+        for completed in range(0, total + 1, step):
+            self.write_chunk({"status": f"pulling {MOCK_DIGEST[7:19]}", "digest": MOCK_DIGEST, "total": total, "completed": completed})
+        self.write_chunk({"status": "success"})
+        self.end_stream()
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping pooled keep-alive connections is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class MockOllamaServer:
+    def __init__(self, token_rate=0, latency=0.0, response_tokens=200, pull_bytes=10 * 1024 * 1024):
+        self.httpd = QuietHTTPServer(("127.0.0.1", 0), MockOllamaHandler)
+        self.httpd.config = {
+            "token_rate": token_rate,
+            "latency": latency,
+            "response_tokens": response_tokens,
+            "pull_bytes": pull_bytes
+        }
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class NullWriter:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+def make_chat(url):
+    chat = chat_module.OllamaTerminalChat()
+    chat.client = chat_module.OllamaClient(base_url=url)
+    chat.cache_enabled = False  # Keep the user's response cache out of the measurements
+    chat.model = MOCK_MODEL
+    return chat
+
+def run_headless(func, *args):
+    stdout = sys.stdout
+    sys.stdout = NullWriter()
+    try:
+        return func(*args)
+    finally:
+        sys.stdout = stdout
+
+def bench_startup(runs):
+    # Fresh interpreters so module import cost is included
+    code = "import belullama_terminal_chat as m; m.OllamaTerminalChat()"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return {"runs": runs, "min_s": min(times), "mean_s": sum(times) / len(times)}
+
+def bench_turns(url, turns):
+    chat = make_chat(url)
+    ttfts = []
+    overheads = []
+    for i in range(turns):
+        start = time.perf_counter()
+        run_headless(chat.stream_model_response, [{"role": "user", "content": f"question {i}"}], chat.model)
+        elapsed = time.perf_counter() - start
+        stats = chat.last_stats
+        ttfts.append(stats.get("ttft", elapsed))
+        overheads.append(elapsed - stats.get("server_time", 0))
+    return {
+        "turns": turns,
+        "ttft_mean_s": sum(ttfts) / len(ttfts),
+        "ttft_max_s": max(ttfts),
+        "overhead_mean_s": sum(overheads) / len(overheads),
+        "overhead_max_s": max(overheads)
+    }
+
+def bench_render(response_tokens):
+    # Unthrottled server, so the measured rate is what the client can render
+    with MockOllamaServer(response_tokens=response_tokens) as server:
+        chat = make_chat(server.url)
+        start = time.perf_counter()
+        run_headless(chat.stream_model_response, [{"role": "user", "content": "render"}], chat.model)
+        elapsed = time.perf_counter() - start
+    return {"tokens": response_tokens, "seconds": elapsed, "tokens_per_sec": response_tokens / elapsed}
+
+def bench_memory(url, turns):
+    chat = make_chat(url)
+    tracemalloc.start()
+    run_headless(chat.chat_turn, "warm up")
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(turns):
+        run_headless(chat.chat_turn, f"turn {i} " + "padding " * 20)
+    thread = chat.conversation_history.summary_thread
+    if thread:
+        thread.join()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "turns": turns,
+        "growth_bytes": current - baseline,
+        "growth_bytes_per_turn": (current - baseline) / turns,
+        "peak_bytes": peak,
+        "history_messages": len(chat.conversation_history.messages),
+        "history_tokens": chat.conversation_history.total_tokens()
+    }
+
+def bench_pull(url):
+    chat = make_chat(url)
+    start = time.perf_counter()
+    ok = run_headless(chat.pull_model, MOCK_MODEL, True)
+    return {"ok": ok, "seconds": time.perf_counter() - start}
+
+def run_benchmarks(args):
+    results = {
+        "config": vars(args),
+        "python": sys.version.split()[0]
+    }
+    results["startup"] = bench_startup(args.startup_runs)
+    with MockOllamaServer(args.token_rate, args.latency, args.response_tokens) as server:
+        results["turns"] = bench_turns(server.url, args.turns)
+    # Generation speed doesn't matter for these, so don't wait on it
+    with MockOllamaServer(response_tokens=args.response_tokens) as server:
+        results["memory"] = bench_memory(server.url, args.memory_turns)
+        results["pull"] = bench_pull(server.url)
+    results["render"] = bench_render(args.render_tokens)
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark Belullama Terminal Chat against a local mock Ollama server")
+    parser.add_argument("--token-rate", type=float, default=200, help="Tokens per second the mock server generates (0 = unlimited)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the mock server sends the first token")
+    parser.add_argument("--response-tokens", type=int, default=100, help="Tokens per mock response")
+    parser.add_argument("--turns", type=int, default=20, help="Turns used to measure first-token time and overhead")
+    parser.add_argument("--memory-turns", type=int, default=200, help="Turns in the long conversation memory test")
+    parser.add_argument("--render-tokens", type=int, default=20000, help="Tokens in the render throughput test")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreter starts to time")
+    parser.add_argument("--out", help="Write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run_benchmarks(args)
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as out_file:
+            out_file.write(output + "\n")
+    else:
+        print(output)
@@ -1,34 +1,557 @@
+import time
+
+STARTUP_TIME = time.perf_counter()  # Taken before the other imports so --profile-startup includes them
+
 import os
 import sys
-import requests
-import time
+import json
+import socket
+import argparse
+import hashlib
 import subprocess
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from colorama import init, Fore, Style
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.history import InMemoryHistory
-from tqdm import tqdm
+
+# Heavier modules are imported on first use, see load_requests() and load_compare_backend().
+# prompt_toolkit, tqdm and sqlite3 are imported where they are needed.
+requests = None
+HTTPAdapter = None
+asyncio = None
+httpx = None
 
 init(autoreset=True)
 
-OLLAMA_URL = "http://localhost:11434"
+def load_requests():
+    global requests, HTTPAdapter
+    import requests
+    from requests.adapters import HTTPAdapter
+
+def load_compare_backend():
+    global asyncio, httpx
+    import asyncio
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return True
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
 LOG_FILE = "/tmp/ollama_server.log"
+SERVER_START_TIMEOUT = 30  # Seconds to wait for a freshly started server to answer
+CONNECT_TIMEOUT = 5
 TIMEOUT = 240  # Increased timeout duration
+POOL_SIZE = 10
+HEALTH_TTL = 30  # Seconds a known connection state is trusted before probing again
+HEARTBEAT_INTERVAL = 30
+PULL_WORKERS = 2  # Models downloaded at the same time by /pull
+PULL_RETRIES = 5  # Ollama resumes partially downloaded layers when a pull is retried
+PULL_RETRY_DELAY = 2
+CACHE_ENABLED = True  # Only deterministic requests (temperature 0 and a fixed seed) are ever cached
+CACHE_PATH = os.path.expanduser("~/.cache/belullama/responses.sqlite")
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+GENERATION_OPTIONS = {}  # Default Ollama options, e.g. {"temperature": 0, "seed": 42}
+COMPARE_CONCURRENCY = 3  # Maximum models queried at the same time by /compare
+COMPARE_COLORS = [Fore.BLUE, Fore.MAGENTA, Fore.YELLOW, Fore.GREEN, Fore.CYAN, Fore.RED]
+KEEP_ALIVE = "30m"  # Keep the model loaded between turns so its prompt cache survives
+HISTORY_TOKEN_BUDGET = 3000  # Estimated prompt tokens kept before old turns are compacted
+HISTORY_COMPACT_RATIO = 0.75  # Compact down to this share of the budget so it doesn't happen every turn
+SUMMARIZE_HISTORY = True  # Replace evicted turns with a model-written summary
+SUMMARY_PROMPT = (
+    "Summarize the following conversation so far in a few sentences. "
+    "Keep names, facts, decisions and open questions. Reply with the summary only."
+)
+
+class OllamaClient:
+    def __init__(self, base_url=OLLAMA_URL, connect_timeout=CONNECT_TIMEOUT, read_timeout=TIMEOUT, pool_size=POOL_SIZE):
+        load_requests()
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.healthy = None
+        self.last_checked = 0
+        self.heartbeat_thread = None
+
+    def request(self, method, path, timeout=None, **kwargs):
+        timeout = (self.connect_timeout, timeout or self.read_timeout)
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.mark_health(False)
+            raise
+        # A client error (bad model name, ...) still means the server is up; a server error doesn't
+        self.mark_health(response.status_code < 500)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def mark_health(self, healthy):
+        self.healthy = healthy
+        self.last_checked = time.monotonic()
+
+    def probe(self):
+        try:
+            response = self.get("/api/tags", timeout=CONNECT_TIMEOUT)
+        except requests.RequestException:
+            self.mark_health(False)
+            return False
+        # Stricter than request(): anything but a 200 here means OLLAMA_URL isn't an Ollama server.
+        # Recorded too, so /status and the cached state agree.
+        healthy = response.status_code == 200
+        self.mark_health(healthy)
+        return healthy
+
+    def is_healthy(self, force=False):
+        if force or self.healthy is None or time.monotonic() - self.last_checked > HEALTH_TTL:
+            return self.probe()
+        return self.healthy
+
+    def start_heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        if self.heartbeat_thread and self.heartbeat_thread.is_alive():
+            return
+        self.heartbeat_thread = threading.Thread(target=self.heartbeat, args=(interval,), daemon=True)
+        self.heartbeat_thread.start()
+
+    def heartbeat(self, interval):
+        while True:
+            time.sleep(interval)
+            # Real traffic already refreshed the state recently, no need for an extra probe
+            if time.monotonic() - self.last_checked >= interval:
+                self.probe()
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        import sqlite3
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, digest TEXT, response TEXT, stats TEXT, "
+            "size INTEGER, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+
+    @staticmethod
+    def is_deterministic(options):
+        return bool(options) and options.get('temperature') == 0 and options.get('seed') is not None
+
+    @staticmethod
+    def model_name(model):
+        # /api/tags always lists the tag, while users often leave the default one off
+        return model if ':' in model else f"{model}:latest"
+
+    @staticmethod
+    def make_key(digest, messages, options):
+        payload = json.dumps({"digest": digest, "messages": messages, "options": options}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT response, stats FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            return row[0], json.loads(row[1])
+
+    def put(self, key, model, digest, response, stats):
+        size = len(response.encode())
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, digest, response, json.dumps(stats), size, time.time())
+            )
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used first
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def invalidate(self, digests):
+        # Drop answers from models that have been re-pulled or updated since they were cached
+        with self.lock:
+            for model, digest in digests.items():
+                self.db.execute("DELETE FROM responses WHERE model = ? AND digest != ?", (model, digest))
+            self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+            self.hits = 0
+            self.misses = 0
+
+class ConversationHistory:
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, summarizer=None):
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.messages = []
+        self.pending = []  # Evicted messages waiting to be folded into the summary
+        self.summary = None
+        self.lock = threading.Lock()
+        self.summary_thread = None
+        self.summary_cancel = None  # Set when a new turn starts, so the summary never delays a reply
+        self.generation = 0  # Bumped by clear() so summaries of a previous conversation are discarded
+
+    @staticmethod
+    def estimate_tokens(text):
+        # Roughly four characters per token plus the chat template overhead
+        return len(text) // 4 + 4
+
+    def append(self, role, content):
+        with self.lock:
+            self.messages.append({"role": role, "content": content, "tokens": self.estimate_tokens(content)})
+
+    def pop(self):
+        with self.lock:
+            return self.messages.pop()
+
+    def clear(self):
+        with self.lock:
+            self.messages = []
+            self.pending = []
+            self.summary = None
+            self.generation += 1
+
+    def total_tokens(self):
+        with self.lock:
+            total = sum(message["tokens"] for message in self.pending + self.messages)
+            if self.summary:
+                total += self.estimate_tokens(self.summary)
+            return total
+
+    def to_messages(self):
+        with self.lock:
+            messages = []
+            if self.summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+            # Evicted turns stay in the prompt until their summary is ready, so nothing is lost in between
+            for message in self.pending + self.messages:
+                messages.append({"role": message["role"], "content": message["content"]})
+            return messages
+
+    def compact(self):
+        if self.total_tokens() <= self.token_budget:
+            return
+
+        target = int(self.token_budget * HISTORY_COMPACT_RATIO)
+        with self.lock:
+            total = sum(message["tokens"] for message in self.messages)
+            evicted = []
+            # Always keep the latest exchange
+            while len(self.messages) > 2 and total > target:
+                message = self.messages.pop(0)
+                total -= message["tokens"]
+                evicted.append(message)
+
+            if self.summarizer is None:
+                return
+            self.pending.extend(evicted)
+            # If summaries keep failing, pending turns alone must not outgrow the budget
+            pending_tokens = sum(message["tokens"] for message in self.pending)
+            while self.pending and pending_tokens > self.token_budget - total:
+                pending_tokens -= self.pending.pop(0)["tokens"]
+            if not self.pending or (self.summary_thread and self.summary_thread.is_alive()):
+                return
+            self.summary_cancel = threading.Event()
+            self.summary_thread = threading.Thread(
+                target=self.summarize_pending, args=(self.generation, self.summary_cancel), daemon=True
+            )
+            self.summary_thread.start()
+
+    def cancel_summary(self):
+        # The turns stay pending and are summarized again after the next reply
+        with self.lock:
+            if self.summary_cancel is not None:
+                self.summary_cancel.set()
+
+    def summarize_pending(self, generation, cancel):
+        with self.lock:
+            if generation != self.generation:
+                return
+            batch = list(self.pending)
+            previous_summary = self.summary
+
+        summary = self.summarizer(previous_summary, batch, cancel)
+        if not summary or cancel.is_set():
+            return  # Keep the turns pending and retry on the next compaction
+
+        with self.lock:
+            if generation != self.generation:
+                return  # The conversation was reset while the summary was being written
+            self.summary = summary
+            # The oldest pending turns may have been dropped meanwhile, so match by identity
+            summarized = set(id(message) for message in batch)
+            self.pending = [message for message in self.pending if id(message) not in summarized]
+
+
+class BatchRunner:
+    def __init__(self, in_path, out_path, workers=4, model=None, cache=None):
+        self.in_path = in_path
+        self.out_path = out_path
+        self.workers = workers
+        self.model = model
+        self.client = OllamaClient(pool_size=max(POOL_SIZE, workers))
+        self.cache = cache
+        self.model_digests = {}
+
+    def load_digests(self):
+        try:
+            response = self.client.get("/api/tags")
+            response.raise_for_status()
+            self.model_digests = {model['name']: model['digest'] for model in response.json()['models']}
+        except (requests.RequestException, KeyError, ValueError) as e:
+            print(Fore.YELLOW + f"Response cache disabled, unable to fetch model digests: {str(e)}")
+            self.cache = None
+            return
+        self.cache.invalidate(self.model_digests)
+
+    def load_done(self):
+        # Results are written in input order, so a crash leaves a valid prefix plus maybe one torn line
+        done = set()
+        if not os.path.exists(self.out_path):
+            return done
+        valid_lines = []
+        with open(self.out_path) as out_file:
+            for line in out_file:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    break
+                if "error" in result and not result.get("invalid_input"):
+                    # Cut the file at the first failure and redo everything after it, so the output stays in
+                    # input order. Bad input lines would fail the same way again, so they stay done.
+                    break
+                done.add(result['index'])
+                valid_lines.append(line if line.endswith("\n") else line + "\n")
+        with open(self.out_path, "w") as out_file:
+            out_file.writelines(valid_lines)
+        return done
+
+    def read_items(self, done):
+        with open(self.in_path) as in_file:
+            for index, line in enumerate(in_file):
+                if index in done or not line.strip():
+                    continue
+                yield index, line
+
+    def run_item(self, index, line):
+        try:
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                raise ValueError("expected a JSON object")
+            if not isinstance(item.get('options') or {}, dict):
+                raise ValueError("'options' must be an object")
+            if not isinstance(item.get('messages') or [], list):
+                raise ValueError("'messages' must be a list")
+            if not isinstance(item.get('prompt') or '', str) or not isinstance(item.get('model') or '', str):
+                raise ValueError("'prompt' and 'model' must be strings")
+        except ValueError as e:
+            return {"index": index, "error": f"Invalid input line: {str(e)}", "invalid_input": True}
+
+        model = item.get('model') or self.model
+        result = {"index": index, "id": item.get('id'), "model": model}
+        messages = item.get('messages') or [{"role": "user", "content": item.get('prompt') or ''}]
+        data = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE
+        }
+        if item.get('options'):
+            data["options"] = item['options']
+
+        cache_model = ResponseCache.model_name(model) if model else None
+        digest = self.model_digests.get(cache_model)
+        key = None
+        if self.cache is not None and digest and ResponseCache.is_deterministic(item.get('options')):
+            key = ResponseCache.make_key(digest, messages, item['options'])
+            start = time.perf_counter()
+            cached = self.cache.get(key)
+            if cached is not None:
+                # Time the lookup like the chat does; only the token counts come from the original run
+                result["response"] = cached[0]
+                result["total_time"] = time.perf_counter() - start
+                result["cached"] = True
+                for name in ("prompt_eval_count", "eval_count"):
+                    if name in cached[1]:
+                        result[name] = cached[1][name]
+                return result
+
+        chunks = []
+        final = {}
+        first_token_time = None
+        start = time.perf_counter()
+        try:
+            with self.client.post("/api/chat", json=data, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if 'error' in chunk:
+                        raise requests.RequestException(chunk['error'])
+                    token = chunk.get('message', {}).get('content', '')
+                    if token and first_token_time is None:
+                        first_token_time = time.perf_counter()
+                    chunks.append(token)
+                    if chunk.get('done'):
+                        final = chunk
+                        break
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            raise  # The server is gone, so stop the run instead of writing an error for every item
+        except (requests.RequestException, ValueError) as e:
+            result["error"] = str(e)
+
+        result["response"] = "".join(chunks)
+        stats = OllamaTerminalChat.compute_stats(start, first_token_time, final)
+        result.update(stats)
+        if key is not None and final and "error" not in result:
+            self.cache.put(key, cache_model, digest, result["response"], stats)
+        return result
+
+    def run(self):
+        if self.cache is not None:
+            self.load_digests()
+        done = self.load_done()
+        if done:
+            print(Fore.YELLOW + f"Resuming: skipping {len(done)} items already in {self.out_path}")
+
+        written = 0
+        failed = 0
+        pending = {}
+        items = self.read_items(done)
+        start = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            with open(self.out_path, "a") as out_file:
+                order = []
+                # Keep only a bounded window of items in flight so huge input files aren't read all at once
+                for index, line in items:
+                    order.append(index)
+                    pending[index] = executor.submit(self.run_item, index, line)
+                    if len(pending) >= self.workers * 2:
+                        written, failed = self.flush(order, pending, out_file, written, failed)
+                while order:
+                    written, failed = self.flush(order, pending, out_file, written, failed)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            # Cancel queued items by hand, shutdown(cancel_futures=True) needs Python 3.9
+            for future in pending.values():
+                future.cancel()
+            executor.shutdown(wait=True)
+            print(Fore.RED + f"Lost connection to Ollama, stopping after {written} results: {str(e)}")
+            print(Fore.RED + "Run the same command again to resume.")
+            return False
+        executor.shutdown()
+
+        elapsed = time.perf_counter() - start
+        print(Fore.GREEN + f"Wrote {written} results ({failed} failed) to {self.out_path} in {elapsed:.1f}s")
+        return True
+
+    def flush(self, order, pending, out_file, written, failed):
+        # Wait for the oldest item only, so results land in input order
+        index = order.pop(0)
+        result = pending.pop(index).result()
+        out_file.write(json.dumps(result) + "\n")
+        out_file.flush()
+        if "error" in result:
+            failed += 1
+            print(Fore.RED + f"Item {index} failed: {result['error']}")
+        return written + 1, failed
 
 class OllamaTerminalChat:
     def __init__(self):
         self.model = None
-        self.conversation_history = []
+        self.client = None  # Created in the background by main(), or set directly when driven headless
+        self.server_process = None
+        self.prefetched_models = None
+        self.startup_phases = []
+        self.phase_start = STARTUP_TIME
+        self.conversation_history = ConversationHistory(
+            summarizer=self.summarize_history if SUMMARIZE_HISTORY else None
+        )
         self.stop_spinner = False
+        self.stream = True
+        self.cancelled = False
+        self.last_stats = {}
+        self.options = dict(GENERATION_OPTIONS)
+        self.cache_enabled = CACHE_ENABLED
+        self.cache = None  # Opened by get_cache() on the first deterministic request
+        self.model_digests = {}
+        self.digest_misses = set()  # Models /api/tags didn't list, so they aren't looked up every turn
+        self.pull_executor = None
+        self.pull_stop = threading.Event()
+        self.pull_responses = set()
+        self.pull_jobs = {}
+        self.pull_progress = {}
+        self.command_completer = None
+        self.command_history = None
+
+    def setup_prompt(self):
+        from prompt_toolkit.completion import WordCompleter
+        from prompt_toolkit.history import InMemoryHistory
+        import prompt_toolkit.patch_stdout
+
         self.command_completer = WordCompleter(
-            ['/bye', '/models', '/reset', '/clear', '/help', '/change', '/status', '/start', '/stop'],
+            ['/bye', '/models', '/reset', '/clear', '/help', '/change', '/status', '/start', '/stop', '/stream', '/history', '/compare', '/pull', '/set', '/cache'],
             ignore_case=True
         )
         self.command_history = InMemoryHistory()
 
+    def connect(self):
+        if self.client is None:
+            self.client = OllamaClient()
+        # Listing the models doubles as the health probe
+        self.prefetched_models = self.get_available_models(quiet=True)
+
     def clear_screen(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+        if os.name == 'nt':
+            os.system('cls')
+        else:
+            sys.stdout.write("\033[2J\033[H")
+            sys.stdout.flush()
+
+    def mark_phase(self, name):
+        now = time.perf_counter()
+        self.startup_phases.append((name, now - self.phase_start))
+        self.phase_start = now
+
+    def print_startup_profile(self):
+        print(Style.DIM + "\nStartup profile:")
+        for name, seconds in self.startup_phases:
+            print(Style.DIM + f"  {name:<24} {seconds * 1000:8.1f} ms")
+        total = sum(seconds for _, seconds in self.startup_phases)
+        print(Style.DIM + f"  {'total':<24} {total * 1000:8.1f} ms")
 
     def print_header(self):
         header = "Belullama Terminal Chat"
@@ -36,22 +559,39 @@ class OllamaTerminalChat:
         print(Fore.CYAN + header.center(80))
         print(Fore.CYAN + "=" * 80)
 
-    def check_ollama_connection(self):
-        try:
-            response = requests.get(f"{OLLAMA_URL}/api/tags", timeout=5)
-            return response.status_code == 200
-        except requests.ConnectionError:
-            return False
-        except requests.Timeout:
-            return False
+    def check_ollama_connection(self, force=False):
+        return self.client.is_healthy(force)
 
     def start_ollama(self):
         try:
             with open(LOG_FILE, "w") as log_file:
-                subprocess.Popen(["ollama", "start"], stdout=log_file, stderr=log_file)
+                self.server_process = subprocess.Popen(["ollama", "start"], stdout=log_file, stderr=log_file)
             print(Fore.GREEN + "Ollama service started.")
-        except subprocess.SubprocessError as e:
+            return True
+        except (subprocess.SubprocessError, OSError) as e:
             print(Fore.RED + f"Failed to start Ollama service: {str(e)}")
+            return False
+
+    def server_log_listening(self):
+        try:
+            with open(LOG_FILE) as log_file:
+                return "Listening on" in log_file.read()
+        except OSError:
+            return False
+
+    def wait_for_server(self, deadline=SERVER_START_TIMEOUT):
+        end = time.monotonic() + deadline
+        delay = 0.05
+        while time.monotonic() < end:
+            if self.client.probe():
+                return True
+            if self.server_process is not None and self.server_process.poll() is not None:
+                return False  # The server process died, waiting longer won't help
+            if self.server_log_listening():
+                delay = 0.05  # The socket is open, so the next probe should succeed
+            time.sleep(min(delay, max(0, end - time.monotonic())))
+            delay = min(delay * 2, 1)
+        return self.client.probe()
 
     def stop_ollama(self):
         try:
@@ -61,35 +601,147 @@ class OllamaTerminalChat:
         except subprocess.SubprocessError as e:
             print(Fore.RED + f"Failed to stop Ollama service: {str(e)}")
 
-    def get_available_models(self):
-        if not self.check_ollama_connection():
-            print(Fore.YELLOW + "Warning: Unable to connect to Ollama server.")
-            return []
-        
+    def get_available_models(self, quiet=False):
         try:
-            response = requests.get(f"{OLLAMA_URL}/api/tags")
+            response = self.client.get("/api/tags")
+            if response.status_code != 200:
+                # Same rule as OllamaClient.probe(), since this listing doubles as the startup probe
+                self.client.mark_health(False)
             response.raise_for_status()
             models = response.json()['models']
+            self.model_digests = {model['name']: model.get('digest') for model in models}
+            self.digest_misses = set()
+            if self.cache is not None:
+                self.cache.invalidate(self.model_digests)
             return [model['name'] for model in models]
+        except (requests.ConnectionError, requests.Timeout):
+            if not quiet:
+                print(Fore.YELLOW + "Warning: Unable to connect to Ollama server.")
+            return []
         except requests.RequestException as e:
-            print(Fore.YELLOW + f"Error fetching models: {str(e)}")
+            if not quiet:
+                print(Fore.YELLOW + f"Error fetching models: {str(e)}")
             return []
 
-    def pull_model(self, model_name):
+    def pull_model(self, model_name, quiet=False):
+        bars = {}
+        layers = {}
         try:
-            with tqdm(total=100, desc=f"Pulling model {model_name}", bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt}") as pbar:
-                for _ in range(100):
-                    time.sleep(0.1)  # Simulate progress
-                    pbar.update(1)
-
-            response = requests.post(f"{OLLAMA_URL}/api/models/pull", json={"model_name": model_name})
-            response.raise_for_status()
+            for attempt in range(PULL_RETRIES + 1):
+                try:
+                    self.stream_pull(model_name, bars, layers, quiet)
+                    break
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                    if attempt == PULL_RETRIES:
+                        raise
+                    if self.pull_stop.is_set():
+                        return False
+                    if not quiet:
+                        print(Fore.YELLOW + f"\nPull of '{model_name}' interrupted ({str(e)}), resuming...")
+                    if self.pull_stop.wait(PULL_RETRY_DELAY * (attempt + 1)):
+                        return False
             print(Fore.GREEN + f"Model '{model_name}' pulled successfully.")
-        except requests.RequestException as e:
+            # The pull may have changed the digest, so the next cache lookup asks /api/tags again,
+            # which also drops answers cached under the old digest
+            name = ResponseCache.model_name(model_name)
+            self.model_digests.pop(name, None)
+            self.digest_misses.discard(name)
+            return True
+        except (requests.RequestException, ValueError) as e:
+            if self.pull_stop.is_set():
+                return False  # Shutting down, not a real failure
             print(Fore.RED + f"Failed to pull model '{model_name}': {str(e)}")
+            return False
+        finally:
+            for bar in bars.values():
+                bar.close()
+
+    def stream_pull(self, model_name, bars, layers, quiet):
+        data = {"model": model_name, "stream": True}
+        with self.client.post("/api/pull", json=data, stream=True) as response:
+            # Registered so shutdown_pulls() can close it and unblock a read in progress
+            self.pull_responses.add(response)
+            try:
+                self.read_pull_stream(model_name, response, bars, layers, quiet)
+            finally:
+                self.pull_responses.discard(response)
+
+    def read_pull_stream(self, model_name, response, bars, layers, quiet):
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if self.pull_stop.is_set():
+                raise requests.RequestException("Pull cancelled")
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if 'error' in chunk:
+                raise requests.RequestException(chunk['error'])
+            digest = chunk.get('digest')
+            if digest and 'total' in chunk:
+                layers[digest] = (chunk.get('completed', 0), chunk['total'])
+                self.pull_progress[model_name] = (
+                    sum(done for done, _ in layers.values()),
+                    sum(total for _, total in layers.values())
+                )
+                if not quiet:
+                    self.update_pull_bar(bars, digest, *layers[digest])
+            if chunk.get('status') == 'success':
+                return
+        # The stream closed without the final status, so the model isn't complete; retrying resumes it
+        raise requests.ConnectionError(f"Pull of '{model_name}' ended before it completed")
+
+    def update_pull_bar(self, bars, digest, completed, total):
+        from tqdm import tqdm
+
+        bar = bars.get(digest)
+        if bar is None:
+            bar = tqdm(total=total, desc=digest.replace('sha256:', '')[:12], unit="B", unit_scale=True, unit_divisor=1024)
+            bars[digest] = bar
+        bar.update(completed - bar.n)
+
+    def prefetch_models(self, model_names):
+        if self.pull_executor is None:
+            self.pull_executor = ThreadPoolExecutor(max_workers=PULL_WORKERS)
+        for model_name in model_names:
+            job = self.pull_jobs.get(model_name)
+            if job and not job.done():
+                print(f"'{model_name}' is already being pulled.")
+                continue
+            self.pull_progress[model_name] = (0, 0)
+            self.pull_jobs[model_name] = self.pull_executor.submit(self.pull_model, model_name, True)
+            print(f"Pulling '{model_name}' in the background.")
+
+    def shutdown_pulls(self):
+        if self.pull_executor is None:
+            return
+        self.pull_stop.set()
+        # Cancel queued pulls by hand, shutdown(cancel_futures=True) needs Python 3.9
+        for job in self.pull_jobs.values():
+            job.cancel()
+        self.pull_executor.shutdown(wait=False)
+        for response in list(self.pull_responses):
+            # Closing the response alone doesn't wake a thread blocked in recv(), shutting the socket down does
+            try:
+                response.raw.connection.sock.shutdown(socket.SHUT_RDWR)
+            except (AttributeError, OSError):
+                pass
+            response.close()
+
+    def print_pull_status(self):
+        if not self.pull_jobs:
+            print("No background pulls.")
+            return
+        for model_name, job in self.pull_jobs.items():
+            completed, total = self.pull_progress.get(model_name, (0, 0))
+            if not job.done():
+                state = f"{completed / total:.0%}" if total else "starting"
+            else:
+                state = "done" if job.result() else "failed"
+            print(f"  - {model_name}: {state}")
 
-    def select_model(self):
-        available_models = self.get_available_models()
+    def select_model(self, available_models=None):
+        if available_models is None:
+            available_models = self.get_available_models()
         
         while True:
             if not available_models:
@@ -138,28 +790,73 @@ class OllamaTerminalChat:
                 time.sleep(0.1)
                 sys.stdout.write('\b')
 
-    def get_model_response(self, prompt, model):
-        if not self.check_ollama_connection():
-            return "[Error] Unable to get response from Ollama. Check server connection."
-        
-        url = f"{OLLAMA_URL}/api/generate"
+    def get_cache(self):
+        if self.cache is None and self.cache_enabled:
+            self.cache = ResponseCache()
+            if self.model_digests:
+                self.cache.invalidate(self.model_digests)
+        return self.cache
+
+    def cache_key(self, messages, model):
+        if not self.cache_enabled or not ResponseCache.is_deterministic(self.options):
+            return None
+        name = ResponseCache.model_name(model)
+        if name not in self.model_digests and name not in self.digest_misses:
+            self.get_available_models(quiet=True)
+            if name not in self.model_digests:
+                self.digest_misses.add(name)
+        digest = self.model_digests.get(name)
+        if not digest or self.get_cache() is None:
+            return None
+        return ResponseCache.make_key(digest, messages, self.options)
+
+    def get_cached_response(self, key):
+        if key is None:
+            return None
+        start = time.perf_counter()
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        self.last_stats = {"total_time": time.perf_counter() - start, "cached": True}
+        return cached[0]
+
+    def store_response(self, key, model, response):
+        if key is not None:
+            name = ResponseCache.model_name(model)
+            self.cache.put(key, name, self.model_digests.get(name), response, self.last_stats)
+
+    def get_model_response(self, messages, model):
+        self.last_stats = {}
+        key = self.cache_key(messages, model)
+        cached = self.get_cached_response(key)
+        if cached is not None:
+            return cached
+
         data = {
             "model": model,
-            "prompt": prompt,
-            "stream": False
+            "messages": messages,
+            "stream": False,
+            "keep_alive": KEEP_ALIVE
         }
+        if self.options:
+            data["options"] = self.options
 
         self.stop_spinner = False
         spinner_thread = threading.Thread(target=self.spinner)
         spinner_thread.start()
+        start = time.perf_counter()
 
         try:
-            response = requests.post(url, json=data, timeout=TIMEOUT)
+            response = self.client.post("/api/chat", json=data)
             response.raise_for_status()
-            return response.json()['response']
+            result = response.json()
+            self.last_stats = self.compute_stats(start, None, result)
+            self.store_response(key, model, result['message']['content'])
+            return result['message']['content']
         except requests.Timeout:
             return "[Error] Response took too long. Please try again later."
-        except requests.RequestException as e:
+        except (requests.RequestException, KeyError, ValueError) as e:
+            # A reply without message.content, or one that isn't JSON, is as unusable as a failed request
             print(Fore.YELLOW + f"Error: {str(e)}")
             return "[Error] Unable to get response from Ollama. Check server connection."
         finally:
@@ -167,6 +864,251 @@ class OllamaTerminalChat:
             spinner_thread.join()
             sys.stdout.write('\b')  # Clear the spinner
 
+    def stream_model_response(self, messages, model):
+        key = self.cache_key(messages, model)
+        cached = self.get_cached_response(key)
+        if cached is not None:
+            # Replay at full speed, there is nothing to wait for
+            print(Fore.BLUE + f"{model}: " + Style.RESET_ALL + cached)
+            self.print_stats(self.last_stats)
+            return cached
+
+        data = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE
+        }
+        if self.options:
+            data["options"] = self.options
+
+        chunks = []
+        final = {}
+        start = time.perf_counter()
+        first_token_time = None
+        response = None
+        self.cancelled = False
+        print(Fore.BLUE + f"{model}: ", end="")
+        sys.stdout.flush()
+
+        try:
+            response = self.client.post("/api/chat", json=data, stream=True)
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if 'error' in chunk:
+                    raise requests.RequestException(chunk['error'])
+                token = chunk.get('message', {}).get('content', '')
+                if token:
+                    if first_token_time is None:
+                        first_token_time = time.perf_counter()
+                    chunks.append(token)
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+                if chunk.get('done'):
+                    final = chunk
+                    break
+        except KeyboardInterrupt:
+            print(Fore.YELLOW + "\n[Generation cancelled]")
+            self.cancelled = True
+        except requests.Timeout:
+            print()
+            return "[Error] Response took too long. Please try again later."
+        except (requests.RequestException, ValueError) as e:
+            print()
+            print(Fore.YELLOW + f"Error: {str(e)}")
+            return "[Error] Unable to get response from Ollama. Check server connection."
+        finally:
+            if response is not None:
+                response.close()
+        print()
+
+        self.last_stats = self.compute_stats(start, first_token_time, final)
+        self.print_stats(self.last_stats)
+        if final:  # Never cache a cancelled, partial answer
+            self.store_response(key, model, "".join(chunks))
+        return "".join(chunks)
+
+    @staticmethod
+    def compute_stats(start, first_token_time, final):
+        stats = {"total_time": time.perf_counter() - start}
+        if first_token_time is not None:
+            stats["ttft"] = first_token_time - start
+        if final.get('total_duration'):
+            stats["server_time"] = final['total_duration'] / 1e9
+        if 'prompt_eval_count' in final:
+            stats["prompt_eval_count"] = final['prompt_eval_count']
+        eval_count = final.get('eval_count')
+        eval_duration = final.get('eval_duration')
+        if eval_count and eval_duration:
+            stats["eval_count"] = eval_count
+            stats["tokens_per_sec"] = eval_count / (eval_duration / 1e9)
+        return stats
+
+    def print_stats(self, stats):
+        parts = []
+        if stats.get("cached"):
+            parts.append("cached")
+        if "ttft" in stats:
+            parts.append(f"first token {stats['ttft']:.2f}s")
+        if "prompt_eval_count" in stats:
+            parts.append(f"{stats['prompt_eval_count']} prompt tokens evaluated")
+        if "tokens_per_sec" in stats:
+            parts.append(f"{stats['eval_count']} tokens at {stats['tokens_per_sec']:.1f} tok/s")
+        parts.append(f"total {stats['total_time']:.2f}s")
+        print(Style.DIM + "[" + ", ".join(parts) + "]")
+
+    def summarize_history(self, previous_summary, messages, cancel):
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        if previous_summary:
+            transcript = f"Earlier summary: {previous_summary}\n{transcript}"
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": transcript}
+            ],
+            "stream": True,
+            "keep_alive": KEEP_ALIVE
+        }
+        parts = []
+        try:
+            # Streamed so a new turn can abort it; closing the response stops generation on the server
+            with self.client.post("/api/chat", json=data, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if cancel.is_set():
+                        return None
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if 'error' in chunk:
+                        return None
+                    parts.append(chunk.get('message', {}).get('content', ''))
+                    if chunk.get('done'):
+                        break
+        except (requests.RequestException, ValueError):
+            return None
+        return "".join(parts).strip() or None
+
+    def print_history_status(self):
+        history = self.conversation_history
+        print(f"Messages: {len(history.messages)} ({len(history.pending)} awaiting summary)")
+        print(f"Estimated tokens: {history.total_tokens()} / {history.token_budget}")
+        print(f"Summary: {history.summary if history.summary else 'none'}")
+
+    def compare_models(self, models, prompt_text):
+        if not load_compare_backend():
+            print(Fore.RED + "The /compare command requires httpx. Install it with: pip install httpx")
+            return
+        try:
+            results = asyncio.run(self.compare_models_async(models, prompt_text))
+        except KeyboardInterrupt:
+            print(Fore.YELLOW + "\n[Comparison cancelled]")
+            return
+        self.print_compare_table(results)
+
+    async def compare_models_async(self, models, prompt_text):
+        semaphore = asyncio.Semaphore(COMPARE_CONCURRENCY)
+        timeout = httpx.Timeout(self.client.read_timeout, connect=self.client.connect_timeout)
+        limits = httpx.Limits(max_connections=COMPARE_CONCURRENCY)
+        async with httpx.AsyncClient(base_url=self.client.base_url, timeout=timeout, limits=limits) as client:
+            tasks = [
+                self.compare_one(client, semaphore, model, prompt_text, COMPARE_COLORS[i % len(COMPARE_COLORS)])
+                for i, model in enumerate(models)
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Anything compare_one didn't handle still becomes an error row instead of ending the chat
+        return [
+            {"model": model, "error": str(result) or type(result).__name__} if isinstance(result, Exception) else result
+            for model, result in zip(models, results)
+        ]
+
+    async def compare_one(self, client, semaphore, model, prompt_text, color):
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt_text}],
+            "stream": True,
+            "keep_alive": KEEP_ALIVE
+        }
+        label = color + f"[{model}] "
+        line = ""
+        final = {}
+        first_token_time = None
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with client.stream("POST", "/api/chat", json=data) as response:
+                    response.raise_for_status()
+                    async for raw in response.aiter_lines():
+                        if not raw:
+                            continue
+                        chunk = json.loads(raw)
+                        if 'error' in chunk:
+                            raise httpx.HTTPError(chunk['error'])
+                        token = chunk.get('message', {}).get('content', '')
+                        if token and first_token_time is None:
+                            first_token_time = time.perf_counter()
+                        # Answers interleave, so only complete lines are printed, each under its model label
+                        line += token
+                        while "\n" in line:
+                            text, line = line.split("\n", 1)
+                            print(label + text)
+                        if chunk.get('done'):
+                            final = chunk
+                            break
+            except (httpx.HTTPError, httpx.StreamError, ValueError) as e:
+                print(label + Fore.RED + f"Error: {str(e)}")
+                return {"model": model, "error": str(e)}
+            if line:
+                print(label + line)
+
+        stats = self.compute_stats(start, first_token_time, final)
+        stats["model"] = model
+        return stats
+
+    def print_compare_table(self, results):
+        print(Fore.CYAN + "\n" + f"{'Model':<30} {'Latency':>10} {'TTFT':>10} {'Tok/s':>10}")
+        print(Fore.CYAN + "-" * 63)
+        for result in results:
+            if "error" in result:
+                print(Fore.RED + f"{result['model']:<30} {'error':>10}  {result['error'][:60]}")
+                continue
+            ttft = f"{result['ttft']:.2f}s" if "ttft" in result else "-"
+            rate = f"{result['tokens_per_sec']:.1f}" if "tokens_per_sec" in result else "-"
+            print(f"{result['model']:<30} {result['total_time']:>9.2f}s {ttft:>10} {rate:>10}")
+
+    def set_option(self, args):
+        name, _, value = args.partition(' ')
+        if not name:
+            print(f"Options: {json.dumps(self.options) if self.options else 'none'}")
+            return
+        if not value.strip():
+            self.options.pop(name, None)
+            print(f"Option '{name}' cleared.")
+            return
+        try:
+            self.options[name] = json.loads(value)
+        except ValueError:
+            self.options[name] = value.strip()
+        print(f"Option '{name}' set to {self.options[name]!r}.")
+
+    def cache_command(self, args):
+        if self.get_cache() is None:
+            print("Response cache is disabled.")
+        elif args == 'clear':
+            self.cache.clear()
+            print("Response cache cleared.")
+        elif args in ('', 'stats'):
+            stats = self.cache.stats()
+            print(f"Cached responses: {stats['entries']} ({stats['bytes'] / 1024:.1f} / {stats['max_bytes'] / 1024:.0f} KiB)")
+            print(f"Hits: {stats['hits']}, misses: {stats['misses']}")
+        else:
+            print("Usage: /cache stats|clear")
+
     def print_help(self):
         print(Fore.YELLOW + "\nAvailable commands:")
         print("/bye - Exit the chat")
@@ -178,28 +1120,88 @@ class OllamaTerminalChat:
         print("/status - Check Ollama server status")
         print("/start - Start the Ollama server")
         print("/stop - Stop the Ollama server")
+        print("/stream - Toggle streaming of responses")
+        print("/history - Show conversation history size and summary")
+        print("/compare model1,model2,... [prompt] - Send one prompt to several models side by side")
+        print("/pull model1,model2,... - Pull models in the background (no argument shows progress)")
+        print("/set [option] [value] - Set a generation option such as temperature or seed (no value clears it)")
+        print("/cache stats|clear - Show or clear the response cache for deterministic prompts")
+
+    def chat_turn(self, user_input):
+        self.conversation_history.cancel_summary()
+        self.conversation_history.append("user", user_input)
+        messages = self.conversation_history.to_messages()
+        
+        self.cancelled = False
+        if self.stream:
+            ai_response = self.stream_model_response(messages, self.model)
+        else:
+            ai_response = self.get_model_response(messages, self.model)
+            if self.last_stats.get("cached"):
+                # Replay at full speed, without the typewriter effect
+                print(Fore.BLUE + f"{self.model}: " + Style.RESET_ALL + ai_response)
+            else:
+                self.print_message(self.model, ai_response)
+            if not ai_response.startswith("[Error]"):
+                self.print_stats(self.last_stats)
+
+        if ai_response.startswith("[Error]"):
+            if self.stream:
+                print(Fore.RED + ai_response)
+            # Drop the failed turn so the history stays a clean, reusable prefix
+            self.conversation_history.pop()
+        elif self.cancelled or not ai_response:
+            # A cancelled or empty answer isn't a real reply, so forget the question too
+            self.conversation_history.pop()
+        else:
+            self.conversation_history.append("assistant", ai_response)
+            # Compaction (and any summary request) runs now, between turns, not before the next reply
+            self.conversation_history.compact()
+        return ai_response
+
+    def main(self, profile_startup=False):
+        self.mark_phase("imports")
+        # Connect, list models and load prompt_toolkit while the header renders
+        connect_thread = threading.Thread(target=self.connect, daemon=True)
+        prompt_thread = threading.Thread(target=self.setup_prompt, daemon=True)
+        connect_thread.start()
+        prompt_thread.start()
 
-    def main(self):
         self.clear_screen()
         self.print_header()
+        self.mark_phase("header")
+
+        connect_thread.join()
+        self.mark_phase("connect + model list")
         
         if not self.check_ollama_connection():
             print(Fore.YELLOW + "Warning: Unable to connect to Ollama server. Trying to start the server...")
-            self.start_ollama()
-            time.sleep(5)  # Wait for a few seconds to allow the server to start
+            if not self.start_ollama() or not self.wait_for_server():
+                print(Fore.RED + "Error: Unable to connect to Ollama server after attempting to start it.")
+                return
+            self.prefetched_models = self.get_available_models()
+            self.mark_phase("server start")
+        self.client.start_heartbeat()
 
-        if not self.check_ollama_connection():
-            print(Fore.RED + "Error: Unable to connect to Ollama server after attempting to start it.")
-            return
+        prompt_thread.join()
+        from prompt_toolkit import prompt
+        from prompt_toolkit.patch_stdout import patch_stdout
+        self.mark_phase("prompt_toolkit")
+        if profile_startup:
+            self.print_startup_profile()
         
-        self.model = self.select_model()
+        self.model = self.select_model(self.prefetched_models)
         print(f"\nUsing model: {self.model}")
 
         while True:
-            user_input = prompt("\nYou: ", completer=self.command_completer, history=self.command_history).strip()
+            # Keep messages from background pulls above the input line
+            with patch_stdout():
+                user_input = prompt("\nYou: ", completer=self.command_completer, history=self.command_history).strip()
             
             if user_input.startswith('/'):
-                command = user_input[1:].lower()
+                command, _, args = user_input[1:].partition(' ')
+                command = command.lower()
+                args = args.strip()
                 if command in ['bye', 'exit', 'quit']:
                     print("Goodbye!")
                     break
@@ -208,7 +1210,7 @@ class OllamaTerminalChat:
                     for model in self.get_available_models():
                         print(f"  - {model}")
                 elif command == 'reset':
-                    self.conversation_history = []
+                    self.conversation_history.clear()
                     print("Conversation history cleared.")
                 elif command == 'clear':
                     self.clear_screen()
@@ -219,26 +1221,69 @@ class OllamaTerminalChat:
                     self.model = self.select_model()
                     print(f"\nSwitched to model: {self.model}")
                 elif command == 'status':
-                    status = "Connected" if self.check_ollama_connection() else "Disconnected"
+                    status = "Connected" if self.check_ollama_connection(force=True) else "Disconnected"
                     print(f"Ollama server status: {status}")
                 elif command == 'start':
-                    self.start_ollama()
-                    time.sleep(5)  # Wait for a few seconds to allow the server to start
-                    if not self.check_ollama_connection():
+                    if self.start_ollama() and not self.wait_for_server():
                         print(Fore.RED + "Error: Unable to connect to Ollama server after attempting to start it.")
                 elif command == 'stop':
                     self.stop_ollama()
+                elif command == 'stream':
+                    self.stream = not self.stream
+                    print(f"Streaming {'enabled' if self.stream else 'disabled'}.")
+                elif command == 'history':
+                    self.print_history_status()
+                elif command == 'compare':
+                    models, _, prompt_text = args.partition(' ')
+                    models = [model.strip() for model in models.split(',') if model.strip()]
+                    if not models:
+                        print("Usage: /compare model1,model2,... [prompt]")
+                        continue
+                    if not prompt_text.strip():
+                        prompt_text = prompt("Prompt: ")
+                    if prompt_text.strip():
+                        self.compare_models(models, prompt_text.strip())
+                elif command == 'pull':
+                    models = [model.strip() for model in args.split(',') if model.strip()]
+                    if models:
+                        self.prefetch_models(models)
+                    else:
+                        self.print_pull_status()
+                elif command == 'set':
+                    self.set_option(args)
+                elif command == 'cache':
+                    self.cache_command(args.lower())
                 else:
                     print(f"Unknown command: {user_input}")
                 continue
             
-            self.conversation_history.append(f"Human: {user_input}")
-            full_prompt = "\n".join(self.conversation_history)
-            
-            ai_response = self.get_model_response(full_prompt, self.model)
-            self.print_message(self.model, ai_response)
-            self.conversation_history.append(f"Assistant: {ai_response}")
+            self.chat_turn(user_input)
             print(Fore.CYAN + "-" * 80)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Belullama Terminal Chat")
+    parser.add_argument("--batch", metavar="IN_JSONL", help="Run the prompts in a JSONL file instead of chatting")
+    parser.add_argument("--out", metavar="OUT_JSONL", help="Where to write batch results (default: <input>.out.jsonl)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent batch requests (default: 4)")
+    parser.add_argument("--model", help="Default model for batch items that don't name one")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the response cache")
+    parser.add_argument("--profile-startup", action="store_true", help="Print how long each startup phase took")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    OllamaTerminalChat().main()
+    args = parse_args()
+    if args.batch:
+        out_path = args.out or os.path.splitext(args.batch)[0] + ".out.jsonl"
+        cache = ResponseCache() if CACHE_ENABLED and not args.no_cache else None
+        runner = BatchRunner(args.batch, out_path, workers=max(1, args.workers), model=args.model, cache=cache)
+        if not runner.run():
+            sys.exit(1)
+    else:
+        if args.no_cache:
+            CACHE_ENABLED = False
+        chat = OllamaTerminalChat()
+        try:
+            chat.main(profile_startup=args.profile_startup)
+        finally:
+            # Don't keep the process alive for background pulls after the chat ends
+            chat.shutdown_pulls()
@@ -13,6 +13,7 @@ pip install requests
 pip install colorama
 pip install prompt_toolkit
 pip install tqdm
+pip install httpx
 # Activate the virtual environment
 source "$VENV_DIR/bin/activate"
 